@@ -0,0 +1,168 @@
+"""
+Benchmark Bedrock request building for long chat sessions
+
+Compares the plain list-of-dicts build against the Conversation build,
+both for a full rebuild (no session or cache miss) and for a warm session
+receiving one new exchange. Bedrock is stubbed, no AWS calls are made.
+
+Usage: python bench_conversation.py
+"""
+import io
+import json
+import time
+from typing import Dict, List
+
+import chat_handler
+
+MODELS = ['anthropic.claude-3-haiku-20240307-v1:0', 'amazon.nova-pro-v1:0']
+SYSTEM_PROMPT = 'Eres un asistente experto en AWS'
+ITERATIONS = 200
+REPEATS = 5
+
+class StubBedrockRuntime:
+    """
+    Records the request body and returns a canned response
+    """
+    def __init__(self):
+        self.body = None
+
+    def invoke_model(self, modelId: str, body: str, contentType: str) -> Dict:
+        self.body = body
+        response = {
+            'content': [{'text': 'ok'}],
+            'output': {'message': {'content': [{'text': 'ok'}]}}
+        }
+        return {'body': io.BytesIO(json.dumps(response).encode('utf-8'))}
+
+def baseline_request_body(model_id: str, messages: List[Dict], system_prompt: str = None) -> Dict:
+    """
+    Request body as built before Conversation caching
+    """
+    bedrock_messages = []
+    last_role = None
+
+    for msg in messages:
+        current_role = msg['role']
+        if last_role == current_role:
+            if current_role == 'user' and bedrock_messages:
+                bedrock_messages[-1]['content'] += f"\n\n{msg['content']}"
+                continue
+            elif current_role == 'assistant' and bedrock_messages:
+                bedrock_messages[-1] = {"role": current_role, "content": msg['content']}
+                continue
+        bedrock_messages.append({"role": current_role, "content": msg['content']})
+        last_role = current_role
+
+    if model_id.startswith('anthropic.claude'):
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 4096,
+            "messages": bedrock_messages,
+            "temperature": 0.7,
+            "top_p": 0.9,
+        }
+        if system_prompt:
+            request_body["system"] = system_prompt
+    else:
+        request_body = {
+            "messages": [{"role": msg["role"], "content": [{"text": msg["content"]}]} for msg in bedrock_messages],
+            "inferenceConfig": {
+                "max_new_tokens": 4096,
+                "temperature": 0.7,
+                "top_p": 0.9,
+            }
+        }
+        if system_prompt:
+            request_body["system"] = [{"text": system_prompt}]
+    return request_body
+
+def make_history(turns: int) -> List[Dict]:
+    history = []
+    for i in range(turns):
+        # Every third message repeats the user role to exercise merging
+        role = 'assistant' if i % 3 == 0 else 'user'
+        history.append({'role': role, 'content': f'Turno {i}: ' + 'Necesito una VPC con subredes privadas. ' * 20})
+    return history
+
+def check_equivalence(stub: StubBedrockRuntime, model_id: str, history: List[Dict]):
+    expected = baseline_request_body(model_id, history, SYSTEM_PROMPT)
+    chat_handler.invoke_bedrock_model(model_id, history, SYSTEM_PROMPT)
+    assert json.loads(stub.body) == expected, f'cold body differs for {model_id}'
+
+    session_id = f'check-{model_id}'
+    chat_handler.invoke_bedrock_model(model_id, history[:-2], SYSTEM_PROMPT, session_id)
+    chat_handler.invoke_bedrock_model(model_id, history, SYSTEM_PROMPT, session_id)
+    assert json.loads(stub.body) == expected, f'warm body differs for {model_id}'
+
+def timed(fn, histories: List[List[Dict]], setup=None) -> float:
+    """
+    Best mean milliseconds per call over REPEATS runs
+    """
+    best = None
+    for _ in range(REPEATS):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for history in histories:
+            fn(history)
+        elapsed = (time.perf_counter() - start) / len(histories) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(turns: int, model_id: str):
+    history = make_history(turns)
+    # One new assistant/user exchange per iteration, as a chat client would send
+    growing = []
+    current = list(history)
+    for i in range(ITERATIONS):
+        current = current + [
+            {'role': 'assistant', 'content': f'Respuesta {i}'},
+            {'role': 'user', 'content': f'Pregunta {i}'}
+        ]
+        growing.append(current)
+
+    baseline_ms = timed(
+        lambda h: json.dumps(baseline_request_body(model_id, h, SYSTEM_PROMPT)),
+        [history] * ITERATIONS
+    )
+    rebuild_ms = timed(
+        lambda h: chat_handler.build_bedrock_request(model_id, h, SYSTEM_PROMPT),
+        [history] * ITERATIONS
+    )
+    session_id = f'bench-{turns}-{model_id}'
+
+    def cache_miss(h):
+        chat_handler.conversation_cache.pop(session_id, None)
+        chat_handler.build_bedrock_request(model_id, h, SYSTEM_PROMPT, session_id)
+
+    miss_ms = timed(cache_miss, [history] * ITERATIONS)
+    baseline_append_ms = timed(
+        lambda h: json.dumps(baseline_request_body(model_id, h, SYSTEM_PROMPT)),
+        growing
+    )
+    cached_append_ms = timed(
+        lambda h: chat_handler.build_bedrock_request(model_id, h, SYSTEM_PROMPT, session_id),
+        growing,
+        # Warm the session on the base history, then reuse it once first so its fragments are filled
+        setup=lambda: [chat_handler.build_bedrock_request(model_id, h, SYSTEM_PROMPT, session_id)
+                       for h in (history, history)]
+    )
+
+    print(f'{turns:>4} turns  {model_id:<42} '
+          f'rebuild {baseline_ms:.3f} -> {rebuild_ms:.3f} ms (cache miss {miss_ms:.3f} ms)  '
+          f'append turn {baseline_append_ms:.3f} -> {cached_append_ms:.3f} ms')
+
+def main():
+    stub = StubBedrockRuntime()
+    chat_handler.bedrock_runtime = stub
+
+    for model_id in MODELS:
+        check_equivalence(stub, model_id, make_history(120))
+
+    print('baseline -> cached, mean per request')
+    for turns in (100, 300):
+        for model_id in MODELS:
+            run(turns, model_id)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 import json
 import boto3
 import os
+import math
+import zlib
+from decimal import Decimal
 from typing import Dict, List, Any
 import logging
 
@@ -16,6 +19,10 @@ dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('REGION', 'us-e
 CHAT_SESSIONS_TABLE = os.environ.get('CHAT_SESSIONS_TABLE')
 chat_table = dynamodb.Table(CHAT_SESSIONS_TABLE) if CHAT_SESSIONS_TABLE else None
 
+# Attributes larger than this are stored zlib-compressed (1 KB is one write unit)
+COMPRESSION_THRESHOLD_BYTES = int(os.environ.get('COMPRESSION_THRESHOLD_BYTES', '1024'))
+STORAGE_FORMAT_VERSION = 1
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler for chat functionality
@@ -98,16 +105,15 @@ def lambda_handler(event, context):
         # Save to DynamoDB if session_id provided
         if session_id and chat_table:
             try:
-                chat_table.put_item(
-                    Item={
-                        'sessionId': session_id,
-                        'timestamp': context.aws_request_id,
-                        'messages': messages,
-                        'response': ai_response,
-                        'modelId': model_id,
-                        'mode': mode
-                    }
-                )
+                item = {
+                    'sessionId': session_id,
+                    'timestamp': context.aws_request_id,
+                    'messages': messages,
+                    'response': ai_response,
+                    'modelId': model_id,
+                    'mode': mode
+                }
+                chat_table.put_item(Item=compress_item(item, ['messages', 'response']))
             except Exception as e:
                 logger.warning(f"Failed to save to DynamoDB: {str(e)}")
         
@@ -154,6 +160,92 @@ Siempre genera:
     else:
         return """Eres un asistente experto en AWS que ayuda con consultas tecnicas, arquitecturas, mejores practicas y soluciones en la nube. Proporciona respuestas claras, precisas y profesionales sobre servicios AWS, implementaciones y recomendaciones."""
 
+def decimal_default(value: Any) -> Any:
+    """
+    JSON fallback for the Decimal numbers boto3 returns from DynamoDB
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def compress_item(item: Dict[str, Any], attributes: List[str]) -> Dict[str, Any]:
+    """
+    Store large attributes as zlib-compressed JSON binaries with a format marker
+    """
+    compressed_item = dict(item)
+    compressed_attributes = []
+    raw_size = 0
+    stored_size = 0
+
+    for name in attributes:
+        if name not in item:
+            continue
+        encoded = json.dumps(item[name], ensure_ascii=False, default=decimal_default).encode('utf-8')
+        if len(encoded) < COMPRESSION_THRESHOLD_BYTES:
+            continue
+        compressed = zlib.compress(encoded, 6)
+        if len(compressed) >= len(encoded):
+            continue
+        compressed_item[name] = compressed
+        compressed_attributes.append(name)
+        raw_size += len(encoded)
+        stored_size += len(compressed)
+
+    if compressed_attributes:
+        compressed_item['compressedAttributes'] = compressed_attributes
+        compressed_item['storageFormat'] = STORAGE_FORMAT_VERSION
+        # Reuse the encoded sizes instead of serializing the item again
+        base_size = estimate_item_size({k: v for k, v in item.items() if k not in compressed_attributes})
+        base_size += sum(len(name.encode('utf-8')) for name in compressed_attributes)
+        marker_size = estimate_item_size({
+            'compressedAttributes': compressed_attributes,
+            'storageFormat': STORAGE_FORMAT_VERSION
+        })
+        wcu_before = math.ceil((base_size + raw_size) / 1024)
+        wcu_after = math.ceil((base_size + stored_size + marker_size) / 1024)
+        logger.info(
+            f"🗜️ COMPRESSED {', '.join(compressed_attributes)}: {raw_size} -> {stored_size} bytes "
+            f"(ratio {raw_size / stored_size:.2f}), WCU {wcu_before} -> {wcu_after}"
+        )
+
+    return compressed_item
+
+def decompress_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restore compressed attributes; items written before compression are returned unchanged
+    """
+    compressed_attributes = item.get('compressedAttributes')
+    if not compressed_attributes:
+        return item
+
+    storage_format = int(item.get('storageFormat', 0))
+    if storage_format != STORAGE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported storage format: {storage_format}")
+
+    decompressed_item = {k: v for k, v in item.items() if k not in ('compressedAttributes', 'storageFormat')}
+    for name in compressed_attributes:
+        value = item[name]
+        # boto3 resources return binary attributes wrapped in Binary
+        data = value.value if hasattr(value, 'value') else bytes(value)
+        # Numbers come back as Decimal, as boto3 returns them for uncompressed items
+        decompressed_item[name] = json.loads(zlib.decompress(data).decode('utf-8'),
+                                             parse_float=Decimal, parse_int=Decimal)
+
+    return decompressed_item
+
+def estimate_item_size(item: Dict[str, Any]) -> int:
+    """
+    Approximate DynamoDB item size in bytes (attribute names plus values)
+    """
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        else:
+            size += len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    return size
+
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """Create HTTP response"""
     return {
@@ -2,9 +2,13 @@ import json
 import boto3
 import logging
 import os
+import math
+import zlib
+from decimal import Decimal
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import uuid
+from collections import OrderedDict
 
 # Configure logging
 logger = logging.getLogger()
@@ -18,6 +22,10 @@ dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', '
 table_name = os.environ.get('DYNAMODB_TABLE')
 table = dynamodb.Table(table_name) if table_name else None
 
+# Attributes larger than this are stored zlib-compressed (1 KB is one write unit)
+COMPRESSION_THRESHOLD_BYTES = int(os.environ.get('COMPRESSION_THRESHOLD_BYTES', '1024'))
+STORAGE_FORMAT_VERSION = 1
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler for chat functionality
@@ -51,7 +59,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         # Process based on mode
         if mode == 'chat-libre':
-            response_text = process_chat_libre(messages, model_id)
+            response_text = process_chat_libre(messages, model_id, session_id)
         elif mode == 'arquitecto':
             response_text = process_arquitecto_mode(messages, model_id, session_id)
         else:
@@ -80,11 +88,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         logger.error(f"Error processing request: {str(e)}")
         return create_error_response(500, f'Internal server error: {str(e)}')
 
-def process_chat_libre(messages: List[Dict], model_id: str) -> str:
+def process_chat_libre(messages: List[Dict], model_id: str, session_id: str = None) -> str:
     """
     Process free chat mode
     """
-    return invoke_bedrock_model(model_id, messages)
+    return invoke_bedrock_model(model_id, messages, session_id=session_id)
 
 def process_arquitecto_mode(messages: List[Dict], model_id: str, session_id: str) -> str:
     """
@@ -163,86 +171,227 @@ Si el usuario da respuestas en otro orden, usa frases libres o menciona algo fue
 
 La conversacion debe sentirse natural, como con un arquitecto de soluciones AWS real. El flujo puede reordenarse o adaptarse dinamicamente, y el modelo debe continuar preguntando lo necesario para llegar a un resultado profesional."""
 
-    return invoke_bedrock_model(model_id, messages, system_prompt)
+    return invoke_bedrock_model(model_id, messages, system_prompt, session_id)
+
+# Separators shared by cached message fragments and the request envelope
+JSON_SEPARATORS = (', ', ': ')
+json_encoder = json.JSONEncoder(separators=JSON_SEPARATORS, check_circular=False)
 
-def invoke_bedrock_model(model_id: str, messages: List[Dict], system_prompt: str = None) -> str:
+# Conversations kept warm between invocations of the same Lambda container
+CONVERSATION_CACHE_SIZE = int(os.environ.get('CONVERSATION_CACHE_SIZE', '64'))
+conversation_cache: 'OrderedDict[str, Conversation]' = OrderedDict()
+
+def text_blocks(content: Any) -> List[Any]:
     """
-    Invoke Bedrock model with conversation history
+    Return content as a list of content blocks
     """
-    try:
+    if isinstance(content, list):
+        return content
+    return [{"type": "text", "text": content}]
+
+class Message:
+    """
+    Single conversation turn with its encoded Bedrock fragments cached per provider
+    """
+    __slots__ = ('role', 'content', 'fragments')
+
+    def __init__(self, role: str, content: Any):
+        self.role = role
+        self.content = content
+        self.fragments = None
+
+    def set_content(self, content: Any):
+        self.content = content
+        self.fragments = None
+
+    def payload(self, provider: str) -> Dict[str, Any]:
+        content = self.content
+        if provider == 'nova':
+            if isinstance(content, list):
+                content = [{"text": block["text"]} if isinstance(block, dict) and block.get("type") == "text" else block
+                           for block in content]
+            else:
+                content = [{"text": content}]
+        elif isinstance(content, list):
+            content = [{"type": "text", "text": block["text"]} if isinstance(block, dict) and "type" not in block and "text" in block else block
+                       for block in content]
+        return {"role": self.role, "content": content}
+
+    def fragment(self, provider: str) -> str:
+        if self.fragments is None:
+            self.fragments = {}
+        cached = self.fragments.get(provider)
+        if cached is None:
+            cached = self.fragments[provider] = json_encoder.encode(self.payload(provider))
+        return cached
+
+class Conversation:
+    """
+    Conversation history with alternating roles enforced on append
+    """
+    __slots__ = ('messages', 'sources')
+
+    def __init__(self, messages: Optional[List[Dict]] = None):
+        self.messages = []
+        # Every client message consumed so far, compared in full before reuse
+        self.sources = []
+        self.extend(messages or [])
+
+    def extend(self, messages: List[Dict]):
+        """
+        Append client messages, normalizing roles as each one is added
+        """
+        self.sources.extend(messages)
+        merged = self.messages
+        last = merged[-1] if merged else None
+        for msg in messages:
+            role = msg['role']
+            content = msg['content']
+            if last is None or last.role != role:
+                last = Message(role, content)
+                merged.append(last)
+            elif role == 'assistant':
+                # Keep only the latest of consecutive assistant messages
+                last.set_content(content)
+            elif role == 'user':
+                # Combine consecutive user messages, as text when both are plain strings
+                if isinstance(last.content, str) and isinstance(content, str):
+                    last.set_content(f"{last.content}\n\n{content}")
+                else:
+                    last.set_content(text_blocks(last.content) + text_blocks(content))
+            else:
+                last = Message(role, content)
+                merged.append(last)
+
+    def continues(self, messages: List[Dict]) -> bool:
+        """
+        Check whether messages is the full history already consumed plus new turns
+        """
+        consumed = len(self.sources)
+        if not consumed or len(messages) < consumed:
+            return False
+        return self.sources == messages[:consumed]
+
+    def payload(self, provider: str) -> List[Dict[str, Any]]:
+        if provider == 'nova':
+            return [msg.payload(provider) for msg in self.messages]
+        # Plain text turns go out unchanged for Claude, skip the per-message call
+        return [{"role": msg.role, "content": msg.content} if isinstance(msg.content, str) else msg.payload(provider)
+                for msg in self.messages]
+
+    def encode(self, provider: str) -> str:
+        """
+        Return the JSON array of messages by joining cached fragments
+        """
+        return '[' + JSON_SEPARATORS[0].join(msg.fragment(provider) for msg in self.messages) + ']'
+
+def get_conversation(session_id: Optional[str], messages: List[Dict]) -> Tuple[Conversation, bool]:
+    """
+    Return the session conversation and whether it was reused from an earlier invocation
+    """
+    if not session_id:
+        return Conversation(messages), False
+
+    conversation = conversation_cache.pop(session_id, None)
+    reused = conversation is not None and conversation.continues(messages)
+    if reused:
+        conversation.extend(messages[len(conversation.sources):])
+    else:
+        conversation = Conversation(messages)
+
+    conversation_cache[session_id] = conversation
+    while len(conversation_cache) > CONVERSATION_CACHE_SIZE:
+        conversation_cache.popitem(last=False)
+    return conversation, reused
+
+def encode_conversation_request(request_body: Dict[str, Any], conversation: Conversation,
+                                provider: str, reused: bool) -> str:
+    """
+    Serialize request body with the conversation messages
+
+    Reused conversations join cached per-message fragments so only new turns
+    are encoded; fresh ones are encoded in a single pass and fill no cache.
+    """
+    if reused:
+        return build_request_body(request_body, conversation.encode(provider))
+    return json_encoder.encode({"messages": conversation.payload(provider), **request_body})
+
+def build_request_body(request_body: Dict[str, Any], messages_json: str) -> str:
+    """
+    Serialize request body, splicing in the pre-encoded messages array
+    """
+    if 'messages' in request_body:
+        raise ValueError('request_body must not define messages')
+    encoded = json_encoder.encode(request_body)
+    if encoded == '{}':
+        return '{"messages": ' + messages_json + '}'
+    return '{"messages": ' + messages_json + JSON_SEPARATORS[0] + encoded[1:]
+
+def build_bedrock_request(model_id: str, messages: List[Dict], system_prompt: str = None, session_id: str = None) -> str:
+    """
+    Build the JSON request body for the given model provider
+    """
+    if model_id.startswith('anthropic.claude') or model_id.startswith('amazon.nova'):
         # Convert messages to Bedrock format and ensure alternating roles
-        bedrock_messages = []
-        last_role = None
+        conversation, reused = get_conversation(session_id, messages)
+
+    if model_id.startswith('anthropic.claude'):
+        # Claude format - send full conversation history
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 4096,
+            "temperature": 0.7,
+            "top_p": 0.9,
+        }
         
-        for msg in messages:
-            current_role = msg['role']
-            
-            # Skip consecutive messages with the same role (except the first one)
-            if last_role == current_role:
-                # If we have consecutive user messages, combine them
-                if current_role == 'user' and bedrock_messages:
-                    bedrock_messages[-1]['content'] += f"\n\n{msg['content']}"
-                    continue
-                # If we have consecutive assistant messages, skip the previous one
-                elif current_role == 'assistant' and bedrock_messages:
-                    bedrock_messages[-1] = {
-                        "role": current_role,
-                        "content": msg['content']
-                    }
-                    continue
-            
-            bedrock_messages.append({
-                "role": current_role,
-                "content": msg['content']
-            })
-            last_role = current_role
+        if system_prompt:
+            request_body["system"] = system_prompt
 
-        # Prepare request based on model provider
-        if model_id.startswith('anthropic.claude'):
-            # Claude format - send full conversation history
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "messages": bedrock_messages,
+        body = encode_conversation_request(request_body, conversation, 'anthropic', reused)
+            
+    elif model_id.startswith('amazon.nova'):
+        # Nova format
+        request_body = {
+            "inferenceConfig": {
+                "max_new_tokens": 4096,
                 "temperature": 0.7,
                 "top_p": 0.9,
             }
+        }
+        
+        if system_prompt:
+            request_body["system"] = [{"text": system_prompt}]
+
+        body = encode_conversation_request(request_body, conversation, 'nova', reused)
             
-            if system_prompt:
-                request_body["system"] = system_prompt
-                
-        elif model_id.startswith('amazon.nova'):
-            # Nova format
-            request_body = {
-                "messages": [{"role": msg["role"], "content": [{"text": msg["content"]}]} for msg in bedrock_messages],
-                "inferenceConfig": {
-                    "max_new_tokens": 4096,
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                }
-            }
-            
-            if system_prompt:
-                request_body["system"] = [{"text": system_prompt}]
-                
-        elif model_id.startswith('amazon.titan'):
-            # Titan format - use last message only (Titan doesn't support conversation history)
-            user_message = messages[-1]['content'] if messages else ""
-            request_body = {
-                "inputText": user_message,
-                "textGenerationConfig": {
-                    "maxTokenCount": 4096,
-                    "temperature": 0.7,
-                    "topP": 0.9,
-                }
+    elif model_id.startswith('amazon.titan'):
+        # Titan format - use last message only (Titan doesn't support conversation history)
+        user_message = messages[-1]['content'] if messages else ""
+        request_body = {
+            "inputText": user_message,
+            "textGenerationConfig": {
+                "maxTokenCount": 4096,
+                "temperature": 0.7,
+                "topP": 0.9,
             }
-        else:
-            raise ValueError(f"Unsupported model: {model_id}")
+        }
+        body = json.dumps(request_body)
+    else:
+        raise ValueError(f"Unsupported model: {model_id}")
+
+    return body
+
+def invoke_bedrock_model(model_id: str, messages: List[Dict], system_prompt: str = None, session_id: str = None) -> str:
+    """
+    Invoke Bedrock model with conversation history
+    """
+    try:
+        body = build_bedrock_request(model_id, messages, system_prompt, session_id)
 
         # Call Bedrock
         response = bedrock_runtime.invoke_model(
             modelId=model_id,
-            body=json.dumps(request_body),
+            body=body,
             contentType='application/json'
         )
 
@@ -281,20 +430,105 @@ def save_chat_session(session_id: str, messages: List[Dict], response: str, mode
             'timestamp': datetime.utcnow().isoformat()
         }]
         
-        table.put_item(
-            Item={
-                'id': session_id,
-                'messages': all_messages,
-                'mode': mode,
-                'updatedAt': datetime.utcnow().isoformat(),
-                'createdAt': datetime.utcnow().isoformat()
-            }
-        )
+        item = {
+            'id': session_id,
+            'messages': all_messages,
+            'mode': mode,
+            'updatedAt': datetime.utcnow().isoformat(),
+            'createdAt': datetime.utcnow().isoformat()
+        }
+        table.put_item(Item=compress_item(item, ['messages']))
         
     except Exception as e:
         logger.error(f"Error saving chat session: {str(e)}")
         # Don't fail the request if we can't save to DynamoDB
 
+def decimal_default(value: Any) -> Any:
+    """
+    JSON fallback for the Decimal numbers boto3 returns from DynamoDB
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def compress_item(item: Dict[str, Any], attributes: List[str]) -> Dict[str, Any]:
+    """
+    Store large attributes as zlib-compressed JSON binaries with a format marker
+    """
+    compressed_item = dict(item)
+    compressed_attributes = []
+    raw_size = 0
+    stored_size = 0
+
+    for name in attributes:
+        if name not in item:
+            continue
+        encoded = json.dumps(item[name], ensure_ascii=False, default=decimal_default).encode('utf-8')
+        if len(encoded) < COMPRESSION_THRESHOLD_BYTES:
+            continue
+        compressed = zlib.compress(encoded, 6)
+        if len(compressed) >= len(encoded):
+            continue
+        compressed_item[name] = compressed
+        compressed_attributes.append(name)
+        raw_size += len(encoded)
+        stored_size += len(compressed)
+
+    if compressed_attributes:
+        compressed_item['compressedAttributes'] = compressed_attributes
+        compressed_item['storageFormat'] = STORAGE_FORMAT_VERSION
+        # Reuse the encoded sizes instead of serializing the item again
+        base_size = estimate_item_size({k: v for k, v in item.items() if k not in compressed_attributes})
+        base_size += sum(len(name.encode('utf-8')) for name in compressed_attributes)
+        marker_size = estimate_item_size({
+            'compressedAttributes': compressed_attributes,
+            'storageFormat': STORAGE_FORMAT_VERSION
+        })
+        wcu_before = math.ceil((base_size + raw_size) / 1024)
+        wcu_after = math.ceil((base_size + stored_size + marker_size) / 1024)
+        logger.info(
+            f"🗜️ COMPRESSED {', '.join(compressed_attributes)}: {raw_size} -> {stored_size} bytes "
+            f"(ratio {raw_size / stored_size:.2f}), WCU {wcu_before} -> {wcu_after}"
+        )
+
+    return compressed_item
+
+def decompress_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restore compressed attributes; items written before compression are returned unchanged
+    """
+    compressed_attributes = item.get('compressedAttributes')
+    if not compressed_attributes:
+        return item
+
+    storage_format = int(item.get('storageFormat', 0))
+    if storage_format != STORAGE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported storage format: {storage_format}")
+
+    decompressed_item = {k: v for k, v in item.items() if k not in ('compressedAttributes', 'storageFormat')}
+    for name in compressed_attributes:
+        value = item[name]
+        # boto3 resources return binary attributes wrapped in Binary
+        data = value.value if hasattr(value, 'value') else bytes(value)
+        # Numbers come back as Decimal, as boto3 returns them for uncompressed items
+        decompressed_item[name] = json.loads(zlib.decompress(data).decode('utf-8'),
+                                             parse_float=Decimal, parse_int=Decimal)
+
+    return decompressed_item
+
+def estimate_item_size(item: Dict[str, Any]) -> int:
+    """
+    Approximate DynamoDB item size in bytes (attribute names plus values)
+    """
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        else:
+            size += len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    return size
+
 def create_error_response(status_code: int, message: str) -> Dict[str, Any]:
     """
     Create standardized error response
@@ -0,0 +1,96 @@
+"""
+Checks for the cross-invocation Conversation cache
+"""
+import json
+
+import pytest
+
+import chat_handler
+
+CLAUDE = 'anthropic.claude-3-haiku-20240307-v1:0'
+NOVA = 'amazon.nova-pro-v1:0'
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    chat_handler.conversation_cache.clear()
+    yield
+    chat_handler.conversation_cache.clear()
+
+def user(content):
+    return {'role': 'user', 'content': content}
+
+def assistant(content):
+    return {'role': 'assistant', 'content': content}
+
+def build(model_id, messages, session_id=None):
+    return json.loads(chat_handler.build_bedrock_request(model_id, messages, 'sistema', session_id))
+
+@pytest.mark.parametrize('model_id', [CLAUDE, NOVA])
+def test_growing_history_reuses_conversation(model_id):
+    history = [user('hola'), assistant('A1'), user('sigue')]
+    build(model_id, history, 's')
+    cached = chat_handler.conversation_cache['s']
+
+    grown = history + [assistant('A2'), user('u3')]
+    body = build(model_id, grown, 's')
+
+    assert chat_handler.conversation_cache['s'] is cached
+    assert body == build(model_id, grown)
+
+@pytest.mark.parametrize('model_id', [CLAUDE, NOVA])
+def test_edited_middle_message_rebuilds(model_id):
+    build(model_id, [user('hola'), assistant('A1'), user('sigue')], 's')
+
+    edited = [user('hola'), assistant('DIFERENTE'), user('sigue'), assistant('A2'), user('u3')]
+    body = build(model_id, edited, 's')
+
+    assert body == build(model_id, edited)
+    assert 'A1' not in json.dumps(body)
+
+@pytest.mark.parametrize('model_id', [CLAUDE, NOVA])
+def test_shorter_history_rebuilds(model_id):
+    build(model_id, [user('u1'), assistant('a1'), user('u2'), assistant('a2'), user('u3')], 's')
+
+    shorter = [user('u1'), assistant('a1'), user('u2')]
+    body = build(model_id, shorter, 's')
+
+    assert body == build(model_id, shorter)
+
+def test_matching_first_and_last_text_does_not_leak_middle_turns():
+    build(CLAUDE, [user('hola'), assistant('privado'), user('sigue')], 'victim')
+
+    probe = [user('hola'), assistant('otro'), user('sigue'), assistant('A2'), user('u3')]
+    for session_id in ('victim', 'other'):
+        body = build(CLAUDE, probe, session_id)
+        assert body == build(CLAUDE, probe)
+        assert 'privado' not in json.dumps(body)
+
+def test_least_recently_used_session_is_evicted(monkeypatch):
+    monkeypatch.setattr(chat_handler, 'CONVERSATION_CACHE_SIZE', 2)
+    history = [user('hola')]
+
+    build(CLAUDE, history, 's1')
+    build(CLAUDE, history, 's2')
+    build(CLAUDE, history, 's1')
+    build(CLAUDE, history, 's3')
+
+    assert list(chat_handler.conversation_cache) == ['s1', 's3']
+
+@pytest.mark.parametrize('first, second', [
+    ('a', [{'type': 'text', 'text': 'b'}]),
+    ([{'type': 'text', 'text': 'a'}], 'b'),
+])
+def test_mixed_user_content_is_merged(first, second):
+    messages = [user(first), user(second), assistant('A1')]
+
+    claude = build(CLAUDE, messages)['messages']
+    assert claude[0] == {'role': 'user', 'content': [{'type': 'text', 'text': 'a'}, {'type': 'text', 'text': 'b'}]}
+    assert [msg['role'] for msg in claude] == ['user', 'assistant']
+
+    nova = build(NOVA, messages)['messages']
+    assert nova[0] == {'role': 'user', 'content': [{'text': 'a'}, {'text': 'b'}]}
+    assert [msg['role'] for msg in nova] == ['user', 'assistant']
+
+def test_request_body_cannot_define_messages():
+    with pytest.raises(ValueError):
+        chat_handler.build_request_body({'messages': []}, '[]')
@@ -0,0 +1,84 @@
+"""
+Round-trip checks for compressed chat session storage
+"""
+import importlib.util
+import os
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import Binary
+
+import chat_handler
+
+def load_chat_app():
+    path = os.path.join(os.path.dirname(__file__), 'chat', 'app.py')
+    spec = importlib.util.spec_from_file_location('chat_app', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+chat_app = load_chat_app()
+
+def make_item():
+    return {
+        'sessionId': 'session-1',
+        'timestamp': 'request-1',
+        'messages': [
+            {'role': 'user', 'content': 'Necesito una VPC con subredes privadas ' * 100},
+            {'role': 'assistant', 'content': 'Resources:\n  Vpc:\n    Type: AWS::EC2::VPC\n' * 100}
+        ],
+        'response': 'Actividad,Responsable,Duracion\nCrear VPC,Arquitecto,1\n' * 100,
+        'modelId': 'amazon.nova-pro-v1:0',
+        'mode': 'arquitecto'
+    }
+
+def as_stored(item):
+    """
+    Mimic what a boto3 resource returns for a stored item
+    """
+    stored = dict(item)
+    for name in item.get('compressedAttributes', []):
+        stored[name] = Binary(item[name])
+    return stored
+
+@pytest.mark.parametrize('module', [chat_handler, chat_app])
+def test_compressed_item_round_trip(module):
+    item = make_item()
+    compressed = module.compress_item(item, ['messages', 'response'])
+
+    assert compressed['compressedAttributes'] == ['messages', 'response']
+    assert compressed['storageFormat'] == module.STORAGE_FORMAT_VERSION
+    assert isinstance(compressed['messages'], bytes)
+    assert module.decompress_item(as_stored(compressed)) == item
+
+@pytest.mark.parametrize('module', [chat_handler, chat_app])
+def test_uncompressed_item_passes_through(module):
+    item = make_item()
+    assert module.decompress_item(item) is item
+
+@pytest.mark.parametrize('module', [chat_handler, chat_app])
+def test_small_attributes_stay_uncompressed(module):
+    item = {'sessionId': 'session-1', 'messages': [{'role': 'user', 'content': 'Hola'}]}
+    assert module.compress_item(item, ['messages']) == item
+
+@pytest.mark.parametrize('module', [chat_handler, chat_app])
+def test_unknown_storage_format_is_rejected(module):
+    compressed = module.compress_item(make_item(), ['messages'])
+    compressed['storageFormat'] = module.STORAGE_FORMAT_VERSION + 1
+    with pytest.raises(ValueError):
+        module.decompress_item(as_stored(compressed))
+
+@pytest.mark.parametrize('module', [chat_handler, chat_app])
+def test_decimal_values_round_trip(module):
+    # A history read back from DynamoDB carries numbers as Decimal
+    item = make_item()
+    item['messages'][0]['tokens'] = Decimal('1234')
+    item['messages'][1]['temperature'] = Decimal('0.7')
+
+    compressed = module.compress_item(item, ['messages'])
+    restored = module.decompress_item(as_stored(compressed))
+
+    assert 'messages' in compressed['compressedAttributes']
+    assert restored == item
+    assert isinstance(restored['messages'][0]['tokens'], Decimal)
+    assert isinstance(restored['messages'][1]['temperature'], Decimal)